@@ -5,75 +5,201 @@
 # Uses librosa for audio analysis.
 
 import os
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import librosa
+    import numpy as np
+    import soundfile as sf  # librosa's own decoder backend
+    _HAVE_LIBROSA = True
+except ImportError:
+    _HAVE_LIBROSA = False
 
 
 # Key names mapped from chroma index
 KEY_NAMES = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
 
+# Sample rate used for analysis — tempo and key don't need the full band
+ANALYSIS_SR = 22050
+
+# Length (seconds) of the central excerpt analyzed for longer tracks
+ANALYSIS_SEGMENT = 45.0
+
+# STFT chromagram settings for key detection (only the time-average is used)
+CHROMA_N_FFT = 4096
+CHROMA_HOP = 2048
+
+# Results keyed by (abspath, mtime_ns, size) so re-analyzing a file is free
+_ANALYSIS_CACHE = {}
+
+# Results are also written next to the audio file so they survive restarts
+SIDECAR_SUFFIX = ".bongoo.json"
+
+# Krumhansl-Schmuckler key profiles
+MAJOR_PROFILE = [6.35, 2.23, 3.48, 2.33, 4.38, 4.09,
+                 2.52, 5.19, 2.39, 3.66, 2.29, 2.88]
+MINOR_PROFILE = [6.33, 2.68, 3.52, 5.38, 2.60, 3.53,
+                 2.54, 4.75, 3.98, 2.69, 3.34, 3.17]
+
+
+def _zscore(values):
+    """Return values as a mean-zero, unit-norm float32 array."""
+    arr = np.asarray(values, dtype=np.float32)
+    arr = arr - arr.mean()
+    return arr / np.linalg.norm(arr)
 
-def analyze(audio_path):
+
+if _HAVE_LIBROSA:
+    _MAJOR_Z = _zscore(MAJOR_PROFILE)
+    _MINOR_Z = _zscore(MINOR_PROFILE)
+    _PROFILES_Z = np.stack([_MAJOR_Z, _MINOR_Z], axis=1)  # (12, 2)
+    # Row s of chroma[_SHIFT_IDX] is chroma rotated by s (np.roll(chroma, -s))
+    _SHIFT_IDX = (np.arange(12)[:, None] + np.arange(12)[None, :]) % 12
+
+
+def _sidecar_path(audio_path):
+    return audio_path + SIDECAR_SUFFIX
+
+
+def _read_sidecar(audio_path, st):
+    """Load a saved result if it was computed for this exact file version.
+    The mtime alone can't tell: yt-dlp and FFmpeg copy the source mtime onto
+    their output, so a re-downloaded file may look older than its sidecar.
+    """
+    path = _sidecar_path(audio_path)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data["mtime_ns"] != st.st_mtime_ns or data["size"] != st.st_size:
+            return None
+        return {"bpm": float(data["bpm"]), "key": str(data["key"])}
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _write_sidecar(audio_path, st, result):
+    """Save a result next to the audio file (best effort)."""
+    try:
+        with open(_sidecar_path(audio_path), "w", encoding="utf-8") as f:
+            json.dump(dict(result, mtime_ns=st.st_mtime_ns, size=st.st_size), f)
+    except OSError:
+        pass
+
+
+def _excerpt_bounds(total):
+    """Return (offset, duration) in seconds of the window to analyze.
+    Tempo and key are global, so the middle of a long track is enough.
+    """
+    if total > ANALYSIS_SEGMENT + 10:
+        return (total - ANALYSIS_SEGMENT) / 2, ANALYSIS_SEGMENT
+    return 0.0, None
+
+
+def _load_excerpt(audio_path):
+    """Decode the analysis window as mono float32 at ANALYSIS_SR.
+    Reads through soundfile directly; falls back to librosa.load for
+    formats libsndfile can't handle on this platform.
+    """
+    try:
+        info = sf.info(audio_path)
+        offset, duration = _excerpt_bounds(info.duration)
+        start = int(offset * info.samplerate)
+        stop = start + int(duration * info.samplerate) if duration else None
+        y, sr = sf.read(audio_path, start=start, stop=stop,
+                        dtype="float32", always_2d=False)
+    except RuntimeError:
+        offset, duration = _excerpt_bounds(librosa.get_duration(path=audio_path))
+        return librosa.load(audio_path, sr=ANALYSIS_SR, mono=True,
+                            offset=offset, duration=duration,
+                            dtype=np.float32)
+    return _to_analysis_format(y, sr)
+
+
+def _excerpt_from_array(data, sr):
+    """Same window as _load_excerpt, cut from already-decoded audio."""
+    offset, duration = _excerpt_bounds(len(data) / sr)
+    start = int(offset * sr)
+    stop = start + int(duration * sr) if duration else None
+    return _to_analysis_format(np.asarray(data[start:stop], dtype=np.float32), sr)
+
+
+def _to_analysis_format(y, sr):
+    """Downmix (samples, channels) to mono and resample to ANALYSIS_SR."""
+    if y.ndim == 2:
+        y = y.mean(axis=1, dtype=np.float32)
+    if sr != ANALYSIS_SR:
+        y = librosa.resample(y, orig_sr=sr, target_sr=ANALYSIS_SR)
+    return y, ANALYSIS_SR
+
+
+def analyze(audio_path, audio=None):
     """Analyze an audio file for BPM and musical key.
 
     Args:
         audio_path: Path to the audio file (MP3/WAV)
+        audio:      Optional (samples, sample_rate) already decoded from
+                    audio_path, to skip decoding it again
 
     Returns:
         dict {"bpm": float, "key": str} or None on failure
     """
-    try:
-        import librosa
-        import numpy as np
-    except ImportError:
+    if not _HAVE_LIBROSA:
         print("librosa not installed. Install: pip install librosa")
         return None
 
-    if not os.path.isfile(audio_path):
-        print(f"File not found: {audio_path}")
-        return None
-
     try:
-        # Load audio (mono, native sample rate)
-        y, sr = librosa.load(audio_path, sr=None, mono=True)
+        # Same file, unchanged since last time → reuse the previous result
+        st = os.stat(audio_path)
+        cache_key = (os.path.abspath(audio_path), st.st_mtime_ns, st.st_size)
+        cached = _ANALYSIS_CACHE.get(cache_key)
+        if cached is None:
+            cached = _read_sidecar(audio_path, st)
+        if cached is not None:
+            _ANALYSIS_CACHE[cache_key] = cached
+            return cached
+
+        # Load audio (mono, ANALYSIS_SR, central excerpt only)
+        if audio is not None:
+            y, sr = _excerpt_from_array(*audio)
+        else:
+            y, sr = _load_excerpt(audio_path)
+
+        # Tempo and chromagram are independent and both spend their time in
+        # GIL-releasing numpy kernels, so run them side by side.
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            bpm_future = pool.submit(librosa.beat.beat_track, y=y, sr=sr)
+            chroma_future = pool.submit(
+                librosa.feature.chroma_stft, y=y, sr=sr,
+                n_fft=CHROMA_N_FFT, hop_length=CHROMA_HOP,
+                tuning=0.0,  # skip estimate_tuning; K-S tolerates detuning
+            )
+            tempo, _ = bpm_future.result()
+            chroma = chroma_future.result()
 
         # --- BPM Detection ---
-        tempo, _ = librosa.beat.beat_track(y=y, sr=sr)
-        # tempo may be an array in newer versions
-        bpm = float(tempo[0]) if hasattr(tempo, '__len__') else float(tempo)
-        bpm = round(bpm, 1)
+        # tempo is a scalar in older librosa, a 1-element array in newer ones
+        bpm = round(float(np.atleast_1d(tempo)[0]), 1)
 
         # --- Key Detection ---
-        # Compute chromagram and find dominant pitch class
-        chroma = librosa.feature.chroma_cqt(y=y, sr=sr)
-        chroma_mean = chroma.mean(axis=1)  # 12 pitch classes
-
-        # Detect major/minor using key profiles (Krumhansl-Schmuckler)
-        major_profile = [6.35, 2.23, 3.48, 2.33, 4.38, 4.09,
-                         2.52, 5.19, 2.39, 3.66, 2.29, 2.88]
-        minor_profile = [6.33, 2.68, 3.52, 5.38, 2.60, 3.53,
-                         2.54, 4.75, 3.98, 2.69, 3.34, 3.17]
-
-        import numpy as np
-        best_corr = -1
-        best_key = "C"
-        best_mode = "major"
-
-        for shift in range(12):
-            rolled = np.roll(chroma_mean, -shift)
-            corr_major = float(np.corrcoef(rolled, major_profile)[0, 1])
-            corr_minor = float(np.corrcoef(rolled, minor_profile)[0, 1])
-
-            if corr_major > best_corr:
-                best_corr = corr_major
-                best_key = KEY_NAMES[shift]
-                best_mode = "major"
-            if corr_minor > best_corr:
-                best_corr = corr_minor
-                best_key = KEY_NAMES[shift]
-                best_mode = "minor"
+        # Average the chromagram (coarse hop is enough) per pitch class
+        chroma_mean = chroma.mean(axis=1, dtype=np.float32)  # 12 pitch classes
+
+        # Detect major/minor using key profiles (Krumhansl-Schmuckler).
+        # Rotating a vector keeps its mean and norm, so z-score once and
+        # then take every rotation — each dot product is a Pearson r.
+        chroma_z = _zscore(chroma_mean)
+        corrs = chroma_z[_SHIFT_IDX] @ _PROFILES_Z  # (12, 2)
+        shift, mode = np.unravel_index(corrs.argmax(), corrs.shape)
+        best_key = KEY_NAMES[shift]
+        best_mode = "minor" if mode else "major"
 
         key = f"{best_key} {best_mode}"
 
-        return {"bpm": bpm, "key": key}
+        result = {"bpm": bpm, "key": key}
+        _ANALYSIS_CACHE[cache_key] = result
+        _write_sidecar(audio_path, st, result)
+        return result
 
     except Exception as e:
         print(f"Analysis failed: {e}")
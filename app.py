@@ -7,12 +7,17 @@
 import os
 import sys
 import re
+import json
 import shutil
-import glob
+import time
+import collections
 import threading
+import traceback
 import subprocess
+import tempfile
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import customtkinter as ctk
-import yt_dlp
 from lyrics import srt_to_lrc
 
 
@@ -21,29 +26,228 @@ ALLOWED_URL = re.compile(
     r'^https?://(www\.)?(youtube\.com|youtu\.be|music\.youtube\.com)/.+$'
 )
 
+# Every prefix ALLOWED_URL can match — a cheap pre-check for arbitrary text
+_YT_PREFIXES = tuple(
+    f"{scheme}://{www}{host}/"
+    for scheme in ("https", "http")
+    for www in ("www.", "")
+    for host in ("youtube.com", "youtu.be", "music.youtube.com")
+)
+
 MAX_URL_LENGTH = 2048
 
+# str.translate table deleting ASCII control characters (NUL, tab, newline, DEL…)
+_CTL_TABLE = dict.fromkeys([*range(32), 127])
+
+# Minimum seconds between progress updates pushed to the UI (~10 Hz)
+PROGRESS_INTERVAL = 0.1
+
+# UI pump: how often (ms) it runs
+UI_PUMP_MS = 100
+
+# Lines kept in the log (pending and on screen) so a long session stays small
+LOG_MAX_LINES = 500
+
+# Parallel HLS/DASH fragment fetches per download (override: BONGOO_CONCURRENCY)
+try:
+    FRAGMENT_CONCURRENCY = max(1, int(os.environ.get("BONGOO_CONCURRENCY", "8")))
+except ValueError:
+    FRAGMENT_CONCURRENCY = 8
+
+# Request size for chunked HTTP downloads (10 MB)
+HTTP_CHUNK_SIZE = 10 * 1024 * 1024
+
+# YoutubeDL instances kept alive for reuse (one per distinct option set)
+YDL_CACHE_SIZE = 4
+
+# Parallel workers for playlist downloads (FFmpeg MP3 encoding is CPU-bound)
+PLAYLIST_WORKERS = min(4, os.cpu_count() or 1)
+
+
+# yt-dlp options shared by every download; do_download copies these and
+# only fills in the per-click fields
+_BASE_OPTS = {
+    "quiet": True,
+    "no_warnings": True,
+    # --- Anti-429: few, well-spaced requests ---
+    # yt-dlp's instant retries only deepen a rate limit; 429s are
+    # retried with long waits by extract_with_retry instead
+    "retries": 0,
+    "extractor_retries": 1,
+    "source_address": "0.0.0.0",  # force IPv4
+    "sleep_interval": 1,
+    "max_sleep_interval": 5,
+    # --- Speed: fetch HLS/DASH fragments in parallel ---
+    # (sleep_interval is per video, so it is unaffected by this)
+    "concurrent_fragment_downloads": FRAGMENT_CONCURRENCY,
+    "http_chunk_size": HTTP_CHUNK_SIZE,
+}
+
+_MP3_OPTS = {
+    "format": "bestaudio/best",
+    "postprocessors": [
+        # 320k CBR encode + cover art (if written) + tags in one FFmpeg run
+        {"key": "BongooMp3Encode", "bitrate": "320k"},
+    ],
+}
+
+
+def _mp4_opts(height):
+    return {
+        # Prefer H.264/AAC streams that drop straight into MP4; others
+        # (VP9/Opus) are only used when no MP4-native pair exists
+        "format": (
+            f"bestvideo[ext=mp4][height<={height}]+bestaudio[ext=m4a]"
+            f"/bestvideo[height<={height}]+bestaudio/best[height<={height}]"
+        ),
+        "merge_output_format": "mp4",
+        "fragment_retries": 10,
+        "postprocessors": [{"key": "FFmpegMetadata"}],
+    }
+
+
+_MP4_OPTS = {height: _mp4_opts(height) for height in (360, 720)}
+
+
 # Browser priority for cookie auto-detection
 _BROWSER_PRIORITY = ["chrome", "edge", "firefox", "brave", "opera", "chromium"]
 
 
+# YouTube's cookies exported from the detected browser. Reading this text
+# file is far cheaper than decrypting the browser's whole cookie database.
+COOKIE_FILE = os.path.join(os.path.expanduser("~"), ".bongoo", "yt_cookies.txt")
+
+
+def export_youtube_cookies(jar, path=COOKIE_FILE):
+    """Save the youtube.com cookies from jar as a Netscape cookies.txt.
+    Returns path, or None if there was nothing to save.
+    """
+    from yt_dlp.cookies import YoutubeDLCookieJar
+    yt_jar = YoutubeDLCookieJar(path)
+    for cookie in jar:
+        domain = cookie.domain.lstrip(".")
+        if domain == "youtube.com" or domain.endswith(".youtube.com"):
+            yt_jar.set_cookie(cookie)
+    if not len(yt_jar):
+        return None
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Session cookies: readable by the owner only
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        os.chmod(path, 0o600)  # O_CREAT's mode doesn't apply to an existing file
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            yt_jar.save(f)
+    except OSError:
+        return None
+    return path
+
+
+def private_cookie_copy(path):
+    """Copy the cookies file to a new owner-only temp file and return its
+    path. Each YoutubeDL writes its jar back to its cookiefile on close,
+    so instances running side by side must not share one file.
+    """
+    fd, tmp = tempfile.mkstemp(prefix="bongoo_cookies_", suffix=".txt")
+    with os.fdopen(fd, "wb") as dst, open(path, "rb") as src:
+        shutil.copyfileobj(src, dst)
+    return tmp
+
+
 def detect_cookie_browser():
     """Auto-detect the best browser for cookie extraction.
     Tries each browser in priority order; returns the first one that works,
-    or None if no browser cookies are accessible.
+    or None if no browser cookies are accessible. The working browser's
+    YouTube cookies are exported to COOKIE_FILE along the way.
     """
-    import yt_dlp.cookies
+    from postprocess import read_browser_cookies
     for browser in _BROWSER_PRIORITY:
+        # Try to open the cookie jar — if it works, the browser is usable
+        jar = read_browser_cookies(browser)
+        if jar is not None:
+            export_youtube_cookies(jar)
+            return browser
+    return None
+
+
+def _clipboard_change_counter():
+    """Return a function giving the OS clipboard change count, or None.
+    Reading the counter is far cheaper than reading the clipboard itself.
+    """
+    if sys.platform == "win32":
         try:
-            # Try to open the cookie jar — if it works, the browser is usable
-            jar = yt_dlp.cookies.extract_cookies_from_browser(browser)
-            if jar is not None:
-                return browser
-        except Exception:
-            continue
+            import ctypes
+            return ctypes.windll.user32.GetClipboardSequenceNumber
+        except (ImportError, AttributeError, OSError):
+            return None
+    if sys.platform == "darwin":
+        try:
+            from AppKit import NSPasteboard  # pyobjc, optional
+            return NSPasteboard.generalPasteboard().changeCount
+        except ImportError:
+            return None
     return None
 
 
+# Clipboard watch: where the OS has a change counter, each poll only reads
+# that; elsewhere the clipboard itself is read, so poll less often there
+_CLIPBOARD_SEQ = _clipboard_change_counter()
+CLIPBOARD_POLL_MS = 1500 if _CLIPBOARD_SEQ else 3000
+
+
+def playlist_count(info):
+    """Number of entries in a playlist info dict, without re-walking it
+    unless yt-dlp handed back a lazy generator.
+    """
+    entries = info["entries"]
+    if isinstance(entries, list):
+        return len(entries)
+    return info.get("playlist_count") or sum(1 for _ in entries)
+
+
+def is_playlist_url(url):
+    """True if url names a playlist (a list= parameter or a /playlist page).
+    Anything else is a single video and needs no flat listing pass.
+    """
+    parts = urllib.parse.urlsplit(url)
+    return parts.path.rstrip("/").endswith("/playlist") or "list" in urllib.parse.parse_qs(parts.query)
+
+
+def new_ydl(opts):
+    """Create a YoutubeDL (with Bongoo's postprocessors). yt_dlp is imported
+    here rather than at the top so the window can appear before its (slow)
+    import has run.
+    """
+    from postprocess import build_ydl
+    return build_ydl(opts)
+
+
+# Small per-user settings file (remembers the detected cookie browser)
+CONFIG_PATH = os.path.join(os.path.expanduser("~"), ".bongoo", "config.json")
+
+# Marks "cookie browser not probed yet" (None means "probed, none found")
+_UNSET = object()
+
+
+def load_config():
+    """Read the settings file, or return {} if missing/unreadable."""
+    try:
+        with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+            cfg = json.load(f)
+        return cfg if isinstance(cfg, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def save_config(cfg):
+    """Write the settings file (best effort)."""
+    try:
+        os.makedirs(os.path.dirname(CONFIG_PATH), exist_ok=True)
+        with open(CONFIG_PATH, "w", encoding="utf-8") as f:
+            json.dump(cfg, f, indent=2)
+    except OSError:
+        pass
+
+
 class App(ctk.CTk):
     def __init__(self):
         super().__init__()
@@ -56,10 +260,32 @@ class App(ctk.CTk):
         ctk.set_default_color_theme("blue")
 
         self.output_dir = os.path.join(os.getcwd(), "downloads")
+        # resolved once per folder change, not on every download
+        self._output_dir_real = os.path.realpath(self.output_dir)
         self.downloading = False
         self._last_clipboard = ""
+        self._clipboard_seq = None
+        self._last_progress_ts = 0.0
+        self._progress_cb = None
+        self._ydl_cache = {}
+        # Worker threads never touch Tk directly. Log lines and callbacks are
+        # buffered (deque append/popleft are thread-safe); status and progress
+        # only keep their latest value, applied once per pump tick.
+        self._log_buf = collections.deque(maxlen=LOG_MAX_LINES)
+        self._ui_calls = collections.deque()
+        self._pending_status = self._shown_status = None
+        self._pending_progress = self._shown_progress = None
+
+        # Cookie browser: reuse the saved one, otherwise probe in the
+        # background so the first download doesn't pay for it
+        self._cookie_lock = threading.Lock()
+        self._cookie_browser = load_config().get("cookie_browser") or _UNSET
+        if self._cookie_browser is _UNSET:
+            threading.Thread(target=self.get_cookie_browser, daemon=True).start()
 
         self.build_ui()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.after(UI_PUMP_MS, self._pump_queue)
 
     def build_ui(self):
         frame = ctk.CTkFrame(self, fg_color="transparent")
@@ -102,7 +328,7 @@ class App(ctk.CTk):
             command=self.pick_folder,
         ).pack(side="right")
 
-        # Options row 2 — playlist + subtitles
+        # Options row 2 — playlist + cover art + subtitles
         opts2 = ctk.CTkFrame(frame, fg_color="transparent")
         opts2.pack(fill="x", pady=(0, 8))
 
@@ -110,6 +336,13 @@ class App(ctk.CTk):
         ctk.CTkSwitch(
             opts2, text="Full playlist",
             variable=self.playlist_var, font=ctk.CTkFont(size=12),
+            command=self.on_playlist_toggle,
+        ).pack(side="left", padx=(0, 12))
+
+        self.thumb_var = ctk.BooleanVar(value=True)
+        ctk.CTkSwitch(
+            opts2, text="🖼 Cover art",
+            variable=self.thumb_var, font=ctk.CTkFont(size=12),
         ).pack(side="left")
 
         self.subtitle_var = ctk.BooleanVar(value=False)
@@ -229,33 +462,85 @@ class App(ctk.CTk):
     # -- helpers --
 
     def write_log(self, msg):
-        def _do():
+        self._log_buf.append(msg)
+
+    def set_status(self, text, color="#8a8a8a"):
+        self._pending_status = (text, color)
+
+    def set_progress(self, val):
+        self._pending_progress = val
+
+    def run_on_ui(self, fn):
+        """Run fn() on the Tk thread from any thread."""
+        self._ui_calls.append(fn)
+
+    def _pump_queue(self):
+        # Apply everything posted since the last tick in a few Tk calls.
+        # Each step is guarded on its own: one failing update must neither
+        # drop the rest of the batch nor stop the pump for the session.
+        try:
+            while self._ui_calls:
+                try:
+                    self._ui_calls.popleft()()
+                except Exception:
+                    traceback.print_exc()
+
+            for step in (self._flush_log, self._flush_status, self._flush_progress):
+                try:
+                    step()
+                except Exception:
+                    traceback.print_exc()
+        finally:
+            self.after(UI_PUMP_MS, self._pump_queue)
+
+    def _flush_log(self):
+        lines = []
+        while self._log_buf:
+            lines.append(self._log_buf.popleft())
+        if lines:
             self.log.configure(state="normal")
-            self.log.insert("end", msg + "\n")
+            self.log.insert("end", "\n".join(lines) + "\n")
+            # drop the oldest lines beyond LOG_MAX_LINES
+            self.log.delete("1.0", f"end-{LOG_MAX_LINES + 1}l")
             self.log.see("end")
             self.log.configure(state="disabled")
-        self.after(0, _do)
 
-    def set_status(self, text, color="#8a8a8a"):
-        self.after(0, lambda: self.status.configure(text=text, text_color=color))
+    def _flush_status(self):
+        status = self._pending_status
+        if status is not self._shown_status:
+            self._shown_status = status
+            self.status.configure(text=status[0], text_color=status[1])
 
-    def set_progress(self, val):
-        self.after(0, lambda: self.progress.set(val))
+    def _flush_progress(self):
+        progress = self._pending_progress
+        if progress is not self._shown_progress:
+            self._shown_progress = progress
+            self.progress.set(progress)
+
+    def on_playlist_toggle(self):
+        # Cover art is one extra image fetch per track — on a whole playlist
+        # that adds up, so it's off unless the user turns it back on
+        if self.playlist_var.get():
+            self.thumb_var.set(False)
 
     def pick_folder(self):
         folder = ctk.filedialog.askdirectory(title="Choose download folder", initialdir=self.output_dir)
         if folder:
             self.output_dir = folder
+            self._output_dir_real = os.path.realpath(folder)
             self.folder_label.configure(text=f"📁 {self.output_dir}")
 
     def open_folder(self):
         os.makedirs(self.output_dir, exist_ok=True)
         if sys.platform == "win32":
-            os.startfile(self.output_dir)
-        elif sys.platform == "darwin":
-            subprocess.Popen(["open", self.output_dir])
-        else:
-            subprocess.Popen(["xdg-open", self.output_dir])
+            os.startfile(self.output_dir)  # already async
+            return
+        # Own session so the file manager outlives Bongoo; no inherited fds
+        cmd = ["open", self.output_dir] if sys.platform == "darwin" else ["xdg-open", self.output_dir]
+        subprocess.Popen(
+            cmd, close_fds=True, start_new_session=True,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
 
     def on_format_change(self, value):
         if value == "MP3":
@@ -268,6 +553,7 @@ class App(ctk.CTk):
     def toggle_clipboard(self):
         if self.clipboard_var.get():
             self._last_clipboard = ""
+            self._clipboard_seq = None
             self.write_log("📋 Clipboard watch enabled")
             self.poll_clipboard()
         else:
@@ -277,16 +563,24 @@ class App(ctk.CTk):
         if not self.clipboard_var.get():
             return
         try:
-            text = self.clipboard_get().strip()
-            if text != self._last_clipboard and ALLOWED_URL.match(text):
-                self._last_clipboard = text
-                self.url_entry.delete(0, "end")
-                self.url_entry.insert(0, text)
-                self.set_status("📋 YouTube link detected!", "#3498db")
-                self.write_log(f"📋 Auto-filled: {text}")
+            # Skip the clipboard round-trip unless the OS says it changed
+            seq = _CLIPBOARD_SEQ() if _CLIPBOARD_SEQ else None
+            if seq is None or seq != self._clipboard_seq:
+                self._clipboard_seq = seq
+                self.check_clipboard()
         except Exception:
             pass
-        self.after(1500, self.poll_clipboard)
+        self.after(CLIPBOARD_POLL_MS, self.poll_clipboard)
+
+    def check_clipboard(self):
+        text = self.clipboard_get().strip()
+        if (text != self._last_clipboard and text.startswith(_YT_PREFIXES)
+                and ALLOWED_URL.match(text)):
+            self._last_clipboard = text
+            self.url_entry.delete(0, "end")
+            self.url_entry.insert(0, text)
+            self.set_status("📋 YouTube link detected!", "#3498db")
+            self.write_log(f"📋 Auto-filled: {text}")
 
     # -- trim helpers --
 
@@ -336,10 +630,15 @@ class App(ctk.CTk):
             self.set_status("Paste a YouTube URL first!", "#e74c3c")
             return
 
+        # cheap checks first, so the regex only sees short, printable input
         if len(url) > MAX_URL_LENGTH:
             self.set_status("URL is too long", "#e74c3c")
             return
 
+        if len(url.translate(_CTL_TABLE)) != len(url):
+            self.set_status("Invalid URL — contains control characters", "#e74c3c")
+            return
+
         if not ALLOWED_URL.match(url):
             self.set_status("Invalid URL — only YouTube links allowed", "#e74c3c")
             self.write_log("Only youtube.com and youtu.be URLs are accepted.")
@@ -363,7 +662,7 @@ class App(ctk.CTk):
         self.set_status("🔄  Starting...", "#f39c12")
         self.set_progress(0)
 
-        self.after(0, lambda: (
+        self.run_on_ui(lambda: (
             self.log.configure(state="normal"),
             self.log.delete("1.0", "end"),
             self.log.configure(state="disabled"),
@@ -373,13 +672,169 @@ class App(ctk.CTk):
             target=self.do_download, args=(url, start, end, mode), daemon=True
         ).start()
 
+    def get_cookie_browser(self, refresh=False):
+        """Return the cookie browser, probing only on first use or refresh."""
+        with self._cookie_lock:
+            if refresh or self._cookie_browser is _UNSET:
+                # Cached instances save their in-memory jar to COOKIE_FILE on
+                # close, so close them now — not over the fresh export later
+                self.clear_ydl_cache()
+                self._cookie_browser = detect_cookie_browser()
+                cfg = load_config()
+                if self._cookie_browser:
+                    cfg["cookie_browser"] = self._cookie_browser
+                    save_config(cfg)
+                elif cfg.pop("cookie_browser", None):
+                    save_config(cfg)
+            return self._cookie_browser
+
+    def forget_cookie_browser(self):
+        """Drop the cookie browser (and its saved entry) so the next
+        download probes the browsers again.
+        """
+        with self._cookie_lock:
+            self._cookie_browser = _UNSET
+            cfg = load_config()
+            if cfg.pop("cookie_browser", None):
+                save_config(cfg)
+
+    def _relay_progress(self, d):
+        # Stable hook for the cached YoutubeDL; forwards to the current download
+        if self._progress_cb is not None:
+            self._progress_cb(d)
+
+    def get_ydl(self, opts):
+        """Return a cached YoutubeDL built with exactly these options.
+        Options can't be swapped on a live instance (postprocessors are
+        registered at init), so each distinct set gets its own instance.
+        """
+        key = repr(sorted((k, v) for k, v in opts.items() if k != "progress_hooks"))
+        ydl = self._ydl_cache.pop(key, None)
+        if ydl is None:
+            ydl = new_ydl(opts)
+            if len(self._ydl_cache) >= YDL_CACHE_SIZE:
+                oldest = next(iter(self._ydl_cache))
+                self._ydl_cache.pop(oldest).close()
+        self._ydl_cache[key] = ydl  # re-insert as most recently used
+        return ydl
+
+    def clear_ydl_cache(self):
+        """Close and forget every cached YoutubeDL."""
+        for ydl in self._ydl_cache.values():
+            try:
+                ydl.close()
+            except Exception:
+                pass
+        self._ydl_cache.clear()
+
+    def on_close(self):
+        self.clear_ydl_cache()
+        self.destroy()
+
+    def extract(self, ydl, url, **kwargs):
+        """ydl.extract_info with long-wait retries on HTTP 429."""
+        from postprocess import extract_with_retry
+        return extract_with_retry(
+            ydl, url,
+            on_retry=lambda wait: self.write_log(f"⏳ Rate limited (429) — retrying in {wait}s"),
+            **kwargs,
+        )
+
+    def list_playlist(self, url, opts):
+        """Return the flat entry list for a playlist URL, or None for a single video."""
+        with new_ydl(dict(opts, extract_flat="in_playlist")) as ydl:
+            info = self.extract(ydl, url, download=False)
+        if "entries" not in info:
+            return None
+        return [e for e in info["entries"] if e]
+
+    def download_playlist(self, entries, opts, ext):
+        """Download playlist entries in parallel, one YoutubeDL per worker.
+        Returns the number of tracks saved.
+        """
+        total = len(entries)
+        finished = 0
+        lock = threading.Lock()
+        # per-chunk hooks from several workers would fight over one bar,
+        # so progress is reported per finished track instead
+        worker_opts = dict(opts, noplaylist=True, progress_hooks=[])
+
+        def fetch(entry):
+            nonlocal finished
+            cookie_copy = None
+            try:
+                entry_url = entry.get("url") or entry.get("webpage_url")
+                entry_opts = worker_opts
+                if worker_opts.get("cookiefile"):
+                    # own copy — workers would overwrite each other's jar on close
+                    cookie_copy = private_cookie_copy(worker_opts["cookiefile"])
+                    entry_opts = dict(worker_opts, cookiefile=cookie_copy)
+                with new_ydl(entry_opts) as ydl:
+                    info = self.extract(ydl, entry_url, download=True)
+                self.write_log(f"Saved: {info.get('title', 'Unknown')}.{ext}")
+            finally:
+                if cookie_copy:
+                    try:
+                        os.remove(cookie_copy)
+                    except OSError:
+                        pass
+                with lock:
+                    finished += 1
+                    self.set_progress(finished / total)
+                    self.set_status(f"⬇️  {finished}/{total} tracks", "#3498db")
+
+        saved = 0
+        with ThreadPoolExecutor(max_workers=PLAYLIST_WORKERS) as pool:
+            for fut in as_completed([pool.submit(fetch, e) for e in entries]):
+                try:
+                    fut.result()
+                    saved += 1
+                except Exception as e:
+                    self.write_log(f"Error: {e}")
+        return saved
+
+    def post_lyrics(self, srt_file):
+        try:
+            lrc_path = srt_to_lrc(srt_file)
+            if lrc_path:
+                self.write_log(f"  Lyrics:   {os.path.basename(lrc_path)}")
+        except Exception as e:
+            self.write_log(f"  Lyrics error: {e}")
+
+    def post_analyze(self, mp3_path):
+        self.set_status("🎵 Analyzing BPM & Key...", "#f39c12")
+        try:
+            from analysis import analyze, format_result
+            result = analyze(mp3_path)
+            if result:
+                self.write_log(f"  Analysis: {format_result(result)}")
+            else:
+                self.write_log("  Analysis: failed (missing librosa?)")
+        except Exception as e:
+            self.write_log(f"  Analysis error: {e}")
+
+    def post_stems(self, mp3_path, stem_model):
+        self.set_status(f"🎛 Separating stems ({stem_model})...", "#f39c12")
+        self.write_log(f"  Separating with {stem_model}...")
+        try:
+            from stems import separate
+            stems_result = separate(mp3_path, model=stem_model)
+            if stems_result:
+                for name, path in stems_result.items():
+                    self.write_log(f"  Stem: {name} → {os.path.basename(path)}")
+            else:
+                self.write_log("  Stem separation failed")
+        except Exception as e:
+            self.write_log(f"  Stem error: {e}")
+
     def do_download(self, url, start=None, end=None, mode="mp3"):
-        output_dir = os.path.realpath(self.output_dir)
+        output_dir = self._output_dir_real
         os.makedirs(output_dir, exist_ok=True)
         subtitles = self.subtitle_var.get()
         normalize = self.normalize_var.get()
         do_analyze = self.analyze_var.get()
         do_stems = self.stems_var.get()
+        embed_thumb = self.thumb_var.get()
         stem_model = "demucs" if self.stem_model_var.get() == "Demucs" else "openunmix"
 
         def on_progress(d):
@@ -388,6 +843,11 @@ class App(ctk.CTk):
                 done = d.get("downloaded_bytes", 0)
                 if total > 0:
                     pct = done / total
+                    # yt-dlp fires this per chunk — only forward ~10 updates/s
+                    now = time.monotonic()
+                    if pct < 1.0 and now - self._last_progress_ts < PROGRESS_INTERVAL:
+                        return
+                    self._last_progress_ts = now
                     self.set_progress(pct)
                     self.set_status(f"⬇️  {pct:.0%} downloaded", "#3498db")
             elif d["status"] == "finished":
@@ -399,49 +859,31 @@ class App(ctk.CTk):
                     self.set_status("🔄  Merging video...", "#f39c12")
                     self.write_log("Merging video tracks...")
 
+        self._progress_cb = on_progress
         ext = "mp4" if mode.startswith("mp4") else "mp3"
 
-        opts = {
-            "outtmpl": os.path.join(output_dir, "%(title)s.%(ext)s"),
-            "noplaylist": not self.playlist_var.get(),
-            "quiet": True,
-            "no_warnings": True,
-            "progress_hooks": [on_progress],
-            # --- Anti-429: retry + backoff ---
-            "retries": 10,
-            "extractor_retries": 5,
-            "retry_sleep_functions": {"http": lambda n: 2 ** n},
-            "sleep_interval": 1,
-            "max_sleep_interval": 5,
-        }
+        opts = dict(_BASE_OPTS)
+        opts["outtmpl"] = os.path.join(output_dir, "%(title)s.%(ext)s")
+        opts["noplaylist"] = not self.playlist_var.get()
+        opts["progress_hooks"] = [self._relay_progress]
 
         # --- Anti-429: auto-detect browser cookies ---
-        cookie_browser = detect_cookie_browser()
+        cookie_browser = self.get_cookie_browser()
         if cookie_browser:
-            opts["cookiesfrombrowser"] = (cookie_browser,)
+            if os.path.isfile(COOKIE_FILE):
+                opts["cookiefile"] = COOKIE_FILE
+            else:
+                opts["cookiesfrombrowser"] = (cookie_browser,)
             self.write_log(f"🍪 Auto-detected {cookie_browser} cookies")
         else:
             self.write_log("🍪 No browser cookies found (may get 429 errors)")
 
         if mode.startswith("mp4"):
-            height = 360 if "360" in mode else 720
-            opts["format"] = (
-                f"bestvideo[height<={height}]+bestaudio/best[height<={height}]"
-            )
-            opts["merge_output_format"] = "mp4"
-            opts["postprocessors"] = [{"key": "FFmpegMetadata"}]
+            opts.update(_MP4_OPTS[360 if "360" in mode else 720])
         else:
-            opts["format"] = "bestaudio/best"
-            opts["writethumbnail"] = True
-            opts["postprocessors"] = [
-                {
-                    "key": "FFmpegExtractAudio",
-                    "preferredcodec": "mp3",
-                    "preferredquality": "320",
-                },
-                {"key": "EmbedThumbnail"},
-                {"key": "FFmpegMetadata"},
-            ]
+            opts.update(_MP3_OPTS)
+            # Cover art costs an extra image fetch per track
+            opts["writethumbnail"] = embed_thumb
 
         if subtitles:
             opts["writesubtitles"] = True
@@ -451,94 +893,97 @@ class App(ctk.CTk):
             self.write_log("📝 Subtitle download enabled")
 
         if start is not None or end is not None:
-            pp_args = []
-            if start is not None:
-                pp_args += ["-ss", str(start)]
-            if end is not None:
-                pp_args += ["-to", str(end)]
-            opts["postprocessor_args"] = {"ffmpeg_i1": pp_args}
+            # yt-dlp fetches only this section: FFmpeg seeks (-ss before -i)
+            # on the stream itself, so neither the download nor the encode
+            # has to go through the skipped part
+            from yt_dlp.utils import download_range_func
+            opts["download_ranges"] = download_range_func(
+                None, [(start or 0, end if end is not None else float("inf"))]
+            )
             self.write_log(f"✂ Trimming: {start or 0}s → {end or 'end'}s")
 
         if normalize and mode == "mp3":
-            opts.setdefault("postprocessor_args", {})
-            norm_args = ["-af", "loudnorm=I=-14:TP=-1:LRA=11"]
-            if "ffmpeg_o" in opts["postprocessor_args"]:
-                opts["postprocessor_args"]["ffmpeg_o"] += norm_args
-            else:
-                opts["postprocessor_args"]["ffmpeg_o"] = norm_args
+            # Measured two-pass loudnorm (-14 LUFS, -1 dBTP), applied as a
+            # constant gain inside the MP3 encode (postprocess.py)
+            opts["postprocessors"] = [
+                {"key": "BongooMp3Encode", "bitrate": "320k", "normalize": True},
+            ]
             self.write_log("🔊 Audio normalization enabled (-14 LUFS)")
 
         try:
-            with yt_dlp.YoutubeDL(opts) as ydl:
-                info = ydl.extract_info(url, download=True)
+            # Playlists: list entries first, then fetch them on parallel workers.
+            # Single-video URLs skip the listing pass (it would mean a second
+            # extraction of the same video).
+            entries = None
+            if self.playlist_var.get() and is_playlist_url(url):
+                entries = self.list_playlist(url, opts)
+            if entries:
+                self.write_log(f"📃 Playlist: {len(entries)} tracks")
+                self.set_status(f"⬇️  0/{len(entries)} tracks", "#3498db")
+                count = self.download_playlist(entries, opts, ext)
+                self.write_log(f"Downloaded {count} tracks!")
+                self.set_status(f"Done — {count} tracks saved", "#2ecc71")
+                self.set_progress(1.0)
+                return
 
-                if "entries" in info:
-                    count = sum(1 for _ in info["entries"])
-                    self.write_log(f"Downloaded {count} tracks!")
-                    self.set_status(f"Done — {count} tracks saved", "#2ecc71")
-                else:
-                    title = info.get("title", "Unknown")
-                    artist = info.get("uploader", info.get("channel", "Unknown"))
-                    duration = info.get("duration", 0)
-
-                    self.write_log(f"Saved: {title}.{ext}")
-                    self.write_log(f"  Artist:   {artist}")
-                    self.write_log(f"  Duration: {int(duration // 60)}:{int(duration % 60):02d}")
-
-                    if subtitles and mode == "mp3":
-                        # Only match SRT files for THIS song (not leftover ones)
-                        safe_title = glob.escape(title)
-                        srt_files = glob.glob(os.path.join(output_dir, f"{safe_title}*.srt"))
-                        for srt_file in srt_files:
-                            lrc_path = srt_to_lrc(srt_file)
-                            if lrc_path:
-                                self.write_log(f"  Lyrics:   {os.path.basename(lrc_path)}")
-
-                    # Post-download: BPM & Key analysis
-                    if do_analyze and mode == "mp3":
-                        mp3_path = os.path.join(output_dir, f"{title}.mp3")
-                        if os.path.isfile(mp3_path):
-                            self.set_status("🎵 Analyzing BPM & Key...", "#f39c12")
-                            try:
-                                from analysis import analyze, format_result
-                                result = analyze(mp3_path)
-                                if result:
-                                    self.write_log(f"  Analysis: {format_result(result)}")
-                                else:
-                                    self.write_log("  Analysis: failed (missing librosa?)")
-                            except Exception as e:
-                                self.write_log(f"  Analysis error: {e}")
-
-                    # Post-download: Stem separation
-                    if do_stems and mode == "mp3":
-                        mp3_path = os.path.join(output_dir, f"{title}.mp3")
-                        if os.path.isfile(mp3_path):
-                            self.set_status(f"🎛 Separating stems ({stem_model})...", "#f39c12")
-                            self.write_log(f"  Separating with {stem_model}...")
-                            try:
-                                from stems import separate
-                                stems_result = separate(mp3_path, model=stem_model)
-                                if stems_result:
-                                    for name, path in stems_result.items():
-                                        self.write_log(f"  Stem: {name} → {os.path.basename(path)}")
-                                else:
-                                    self.write_log("  Stem separation failed")
-                            except Exception as e:
-                                self.write_log(f"  Stem error: {e}")
-
-                    self.set_status(f"✅ Done — {title}.{ext}", "#2ecc71")
+            ydl = self.get_ydl(opts)
+            info = self.extract(ydl, url, download=True)
 
-                self.set_progress(1.0)
+            if "entries" in info:
+                count = playlist_count(info)
+                self.write_log(f"Downloaded {count} tracks!")
+                self.set_status(f"Done — {count} tracks saved", "#2ecc71")
+            else:
+                title = info.get("title", "Unknown")
+                artist = info.get("uploader", info.get("channel", "Unknown"))
+                duration = info.get("duration", 0)
+
+                self.write_log(f"Saved: {title}.{ext}")
+                self.write_log(f"  Artist:   {artist}")
+                self.write_log(f"  Duration: {int(duration // 60)}:{int(duration % 60):02d}")
+
+                from postprocess import final_filepath, subtitle_files
+
+                # Post-download steps are independent (lyrics is file I/O,
+                # analysis is GIL-releasing numpy, stems is torch), so
+                # overlap them instead of running one after another
+                tasks = []
+                if subtitles and mode == "mp3":
+                    # yt-dlp's own paths: only THIS song's SRT files, under
+                    # the sanitized name (the raw title may not match it)
+                    tasks += [(self.post_lyrics, srt_file) for srt_file in subtitle_files(info)]
+
+                # yt-dlp's own path — the title may have been sanitized
+                mp3_path = final_filepath(info)
+                if mode == "mp3" and mp3_path and os.path.isfile(mp3_path):
+                    if do_analyze:
+                        tasks.append((self.post_analyze, mp3_path))
+                    if do_stems:
+                        tasks.append((self.post_stems, mp3_path, stem_model))
+
+                if tasks:
+                    with ThreadPoolExecutor(max_workers=3) as pool:
+                        for fut in as_completed([pool.submit(*t) for t in tasks]):
+                            fut.result()
+
+                self.set_status(f"✅ Done — {title}.{ext}", "#2ecc71")
+
+            self.set_progress(1.0)
         except Exception as e:
             self.write_log(f"Error: {e}")
             self.set_status("Download failed", "#e74c3c")
             self.set_progress(0)
+            # Cookies stale or the browser gone — re-probe (and re-export
+            # COOKIE_FILE) next time. Other failures (bad URL, removed
+            # video, lasting 429) leave the cookie setup alone.
+            from postprocess import is_cookie_failure
+            if is_cookie_failure(e):
+                self.forget_cookie_browser()
         finally:
             self.downloading = False
-            fmt_label = self.format_var.get()
-            self.after(0, lambda: (
+            self.run_on_ui(lambda: (
                 self.dl_btn.configure(
-                    text=f"⬇  Download {fmt_label}",
+                    text=f"⬇  Download {self.format_var.get()}",
                     state="normal", fg_color="#6C3CE1"
                 ),
                 self.url_entry.configure(state="normal"),
@@ -2,25 +2,40 @@
 # by itu-dallasli
 #
 # Usage: python build.py
-# Output: dist/Bongoo.exe
+# Output: dist/Bongoo/Bongoo.exe
+#
+# Builds a folder (--onedir) rather than a single self-extracting .exe:
+# --onefile unpacks everything to a temp dir on every launch, which adds
+# seconds to startup. Ship the whole dist/Bongoo folder.
 
 import subprocess
 import sys
 
 cmd = [
     sys.executable, "-m", "PyInstaller",
-    "--onefile",
+    "--onedir",
     "--windowed",
     "--name", "Bongoo",
     "--collect-data", "customtkinter",
-    "app.py",
+    # test suites pulled in by the stdlib/tkinter, never used at runtime
+    "--exclude-module", "test",
+    "--exclude-module", "tkinter.test",
+    # PyInstaller uses UPX whenever it is on PATH; UPX binaries are
+    # decompressed on every launch, and it breaks CFG-protected DLLs
+    "--noupx",
 ]
 
-print("Building Bongoo.exe ...")
+if sys.platform.startswith("linux"):
+    # (stripping would invalidate code signatures on macOS)
+    cmd.append("--strip")
+
+cmd.append("app.py")
+
+print("Building Bongoo ...")
 result = subprocess.run(cmd)
 
 if result.returncode == 0:
-    print("\nDone! Output: dist/Bongoo.exe")
+    print("\nDone! Output: dist/Bongoo/Bongoo.exe")
     print("Note: FFmpeg must be in the same folder or in system PATH.")
 else:
     print("\nBuild failed!")
@@ -6,13 +6,10 @@
 
 import sys
 import os
-import re
 import shutil
 import argparse
-import glob
+import json
 import time
-import yt_dlp
-from lyrics import srt_to_lrc
 
 
 # Supported browsers for cookie auto-detection (tried in order)
@@ -21,31 +18,70 @@ _BROWSER_PRIORITY = ["chrome", "edge", "firefox", "brave", "opera", "chromium"]
 
 def detect_cookie_browser():
     """Auto-detect the best browser for cookie extraction."""
-    import yt_dlp.cookies
+    from postprocess import read_browser_cookies
     for browser in _BROWSER_PRIORITY:
-        try:
-            jar = yt_dlp.cookies.extract_cookies_from_browser(browser)
-            if jar is not None:
-                return browser
-        except Exception:
-            continue
+        if read_browser_cookies(browser) is not None:
+            return browser
     return None
 
 
+# Last working cookie browser, reused for a day instead of re-probing
+COOKIE_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".bongoo", "cookie_browser.json")
+COOKIE_CACHE_TTL = 24 * 3600
+
+
+def cached_cookie_browser():
+    """Return the cookie browser, probing only when the cache is stale."""
+    try:
+        with open(COOKIE_CACHE_PATH, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        if time.time() - cached["ts"] < COOKIE_CACHE_TTL:
+            return cached["browser"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    browser = detect_cookie_browser()
+    if browser:
+        try:
+            os.makedirs(os.path.dirname(COOKIE_CACHE_PATH), exist_ok=True)
+            with open(COOKIE_CACHE_PATH, "w", encoding="utf-8") as f:
+                json.dump({"browser": browser, "ts": time.time()}, f)
+        except OSError:
+            pass
+    return browser
+
+
+def clear_cookie_cache():
+    """Forget the cached browser so the next run probes again."""
+    try:
+        os.remove(COOKIE_CACHE_PATH)
+    except OSError:
+        pass
+
+
 # only allow real youtube URLs — blocks command injection via crafted strings
-ALLOWED_URL = re.compile(
-    r'^https?://(www\.)?(youtube\.com|youtu\.be|music\.youtube\.com)/.+$'
+_ALLOWED_PREFIXES = tuple(
+    f"{scheme}://{www}{host}/"
+    for scheme in ("https", "http")
+    for www in ("www.", "")
+    for host in ("youtube.com", "youtu.be", "music.youtube.com")
 )
 
 MAX_URL_LENGTH = 2048
 
+# str.translate table deleting ASCII control characters (NUL, tab, newline, DEL…)
+_CTL_TABLE = dict.fromkeys([*range(32), 127])
+
 
 def validate_url(url):
     """Reject anything that isn't a YouTube URL."""
     if len(url) > MAX_URL_LENGTH:
         print("URL is too long.")
         sys.exit(1)
-    if not ALLOWED_URL.match(url):
+    # Known scheme + host prefix, something after it, no control characters
+    if (not url.startswith(_ALLOWED_PREFIXES)
+            or url in _ALLOWED_PREFIXES
+            or len(url.translate(_CTL_TABLE)) != len(url)):
         print("Invalid URL. Only YouTube links are accepted.")
         print("Example: https://www.youtube.com/watch?v=VIDEO_ID")
         sys.exit(1)
@@ -73,6 +109,46 @@ def validate_seconds(value, name):
         sys.exit(1)
 
 
+# Max rate (Hz) at which a caller's progress callback is invoked
+PROGRESS_HZ = 10
+
+
+def _throttle(cb, hz=PROGRESS_HZ):
+    """Wrap a yt-dlp progress hook so it runs at most hz times a second.
+    yt-dlp calls hooks on every received chunk; non-"downloading" events
+    (finished, error) always pass through.
+    """
+    interval = 1.0 / hz
+    last = 0.0
+
+    def hook(d):
+        nonlocal last
+        now = time.monotonic()
+        if d["status"] != "downloading" or now - last >= interval:
+            last = now
+            cb(d)
+
+    return hook
+
+
+def downloaded_srt_files(info, output_dir, since):
+    """SRT files written for this download.
+    Uses yt-dlp's record of the subtitle files; if it has none, falls back
+    to .srt files in output_dir created after since (a time.time() value),
+    so old subtitles from earlier runs aren't converted again.
+    """
+    from postprocess import subtitle_files
+    paths = subtitle_files(info)
+    if paths:
+        return paths
+    with os.scandir(output_dir) as it:
+        return [e.path for e in it
+                # st_ctime, not st_mtime: yt-dlp may backdate the mtime to
+                # the server's Last-Modified (creation/inode-change time on
+                # Windows/POSIX is always "now")
+                if e.name.endswith(".srt") and e.is_file() and e.stat().st_ctime >= since]
+
+
 def check_ffmpeg():
     if shutil.which("ffmpeg") is None:
         print("FFmpeg is not installed!")
@@ -96,7 +172,8 @@ def download(url, output_dir="downloads", start=None, end=None,
         quality:    Video quality (360 or 720)
         subtitles:  Download subtitles/lyrics
         normalize:  Apply audio normalization (loudnorm)
-        on_progress: Optional callback(dict) for progress hooks
+        on_progress: Optional callback(dict) for progress hooks, called at
+                     most PROGRESS_HZ times a second while downloading
     """
     url = validate_url(url)
     output_dir = sanitize_path(output_dir)
@@ -108,16 +185,18 @@ def download(url, output_dir="downloads", start=None, end=None,
         "outtmpl": outtmpl,
         "quiet": False,
         "no_warnings": False,
-        # --- Anti-429: retry + backoff ---
-        "retries": 10,
-        "extractor_retries": 5,
-        "retry_sleep_functions": {"http": lambda n: 2 ** n},  # exponential backoff
+        # --- Anti-429: few, well-spaced requests ---
+        # yt-dlp's instant retries only deepen a rate limit; 429s are
+        # retried with long waits by extract_with_retry instead
+        "retries": 0,
+        "extractor_retries": 1,
+        "source_address": "0.0.0.0",  # force IPv4
         "sleep_interval": 1,       # wait 1s before each download
         "max_sleep_interval": 5,   # random 1-5s between playlist items
     }
 
     # --- Anti-429: auto-detect browser cookies ---
-    cookie_browser = detect_cookie_browser()
+    cookie_browser = cached_cookie_browser()
     if cookie_browser:
         opts["cookiesfrombrowser"] = (cookie_browser,)
         print(f"🍪 Using {cookie_browser} cookies")
@@ -125,8 +204,11 @@ def download(url, output_dir="downloads", start=None, end=None,
     # ---------- Format selection ----------
     if mode.startswith("mp4"):
         height = 360 if "360" in mode else 720
+        # Prefer H.264/AAC streams that drop straight into MP4; others
+        # (VP9/Opus) are only used when no MP4-native pair exists
         opts["format"] = (
-            f"bestvideo[height<={height}]+bestaudio/best[height<={height}]"
+            f"bestvideo[ext=mp4][height<={height}]+bestaudio[ext=m4a]"
+            f"/bestvideo[height<={height}]+bestaudio/best[height<={height}]"
         )
         opts["merge_output_format"] = "mp4"
         opts["postprocessors"] = [{"key": "FFmpegMetadata"}]
@@ -135,13 +217,8 @@ def download(url, output_dir="downloads", start=None, end=None,
         opts["format"] = "bestaudio/best"
         opts["writethumbnail"] = True
         opts["postprocessors"] = [
-            {
-                "key": "FFmpegExtractAudio",
-                "preferredcodec": "mp3",
-                "preferredquality": "320",
-            },
-            {"key": "EmbedThumbnail"},
-            {"key": "FFmpegMetadata"},
+            # 320k CBR encode + cover art + tags in one FFmpeg run (postprocess.py)
+            {"key": "BongooMp3Encode", "bitrate": "320k"},
         ]
 
     # ---------- Subtitles ----------
@@ -153,26 +230,25 @@ def download(url, output_dir="downloads", start=None, end=None,
 
     # ---------- Trim (time interval) ----------
     if start is not None or end is not None:
-        pp_args = []
-        if start is not None:
-            pp_args += ["-ss", str(start)]
-        if end is not None:
-            pp_args += ["-to", str(end)]
-        opts["postprocessor_args"] = {"ffmpeg_i1": pp_args}
+        # yt-dlp fetches only this section: FFmpeg seeks (-ss before -i)
+        # on the stream itself, so neither the download nor the encode
+        # has to go through the skipped part
+        from yt_dlp.utils import download_range_func
+        opts["download_ranges"] = download_range_func(
+            None, [(start or 0, end if end is not None else float("inf"))]
+        )
 
     # ---------- Audio normalization ----------
     if normalize and mode == "mp3":
-        opts.setdefault("postprocessor_args", {})
-        # loudnorm filter: -14 LUFS target, -1 dBTP true peak
-        norm_args = ["-af", "loudnorm=I=-14:TP=-1:LRA=11"]
-        if "ffmpeg_o" in opts["postprocessor_args"]:
-            opts["postprocessor_args"]["ffmpeg_o"] += norm_args
-        else:
-            opts["postprocessor_args"]["ffmpeg_o"] = norm_args
+        # Measured two-pass loudnorm (-14 LUFS, -1 dBTP), applied as a
+        # constant gain inside the MP3 encode (postprocess.py)
+        opts["postprocessors"] = [
+            {"key": "BongooMp3Encode", "bitrate": "320k", "normalize": True},
+        ]
 
     # ---------- Progress hook ----------
     if on_progress:
-        opts["progress_hooks"] = [on_progress]
+        opts["progress_hooks"] = [_throttle(on_progress)]
 
     ext = "mp4" if mode.startswith("mp4") else "mp3"
     print(f"\nDownloading: {url}")
@@ -186,15 +262,23 @@ def download(url, output_dir="downloads", start=None, end=None,
         print("Normalization: enabled (loudnorm -14 LUFS)")
     print()
 
+    # yt-dlp is imported only now (~0.5 s), so --help and argument errors
+    # return immediately
+    from postprocess import build_ydl, extract_with_retry
+
+    started = time.time()
     try:
-        with yt_dlp.YoutubeDL(opts) as ydl:
-            info = ydl.extract_info(url, download=True)
+        with build_ydl(opts) as ydl:
+            info = extract_with_retry(
+                ydl, url, download=True,
+                on_retry=lambda wait: print(f"Rate limited (429) — retrying in {wait}s"),
+            )
             title = info.get("title", "Unknown")
 
             # Convert .srt to .lrc for MP3 downloads
             if subtitles and mode == "mp3":
-                srt_files = glob.glob(os.path.join(output_dir, "*.srt"))
-                for srt_file in srt_files:
+                from lyrics import srt_to_lrc
+                for srt_file in downloaded_srt_files(info, output_dir, started):
                     lrc_path = srt_to_lrc(srt_file)
                     if lrc_path:
                         print(f"Lyrics saved: {os.path.basename(lrc_path)}")
@@ -203,6 +287,8 @@ def download(url, output_dir="downloads", start=None, end=None,
             return info
     except Exception as e:
         print(f"\nFailed: {e}")
+        # Cookies may be stale or the browser gone — re-probe next run
+        clear_cookie_cache()
         sys.exit(1)
 
 
@@ -250,30 +336,40 @@ if __name__ == "__main__":
     info = download(args.url, args.output, start=args.start, end=args.end,
                     mode=mode, subtitles=args.subtitles, normalize=args.normalize)
 
+    # Post-download steps work on the file yt-dlp actually wrote (the title
+    # may have been sanitized for the filesystem)
+    from postprocess import final_filepath
+    final_path = final_filepath(info) if info and mode == "mp3" else None
+    if final_path and not os.path.isfile(final_path):
+        final_path = None
+
+    # Stems (Open-Unmix) and analysis both need the decoded audio — decode once
+    audio = None
+    if final_path and args.stems and args.analyze and args.stem_model == "openunmix":
+        from stems import load_audio
+        try:
+            audio = load_audio(final_path)
+        except Exception as e:
+            print(f"Could not decode {os.path.basename(final_path)}: {e}")
+
     # Post-download: stem separation
-    if args.stems and mode == "mp3" and info:
+    if args.stems and final_path:
         from stems import separate
-        title = info.get("title", "Unknown")
-        mp3_path = os.path.join(args.output, f"{title}.mp3")
-        if os.path.isfile(mp3_path):
-            print(f"\nSeparating stems ({args.stem_model})...")
-            result = separate(mp3_path, model=args.stem_model)
-            if result:
-                print("Stems saved:")
-                for name, path in result.items():
-                    print(f"  {name}: {os.path.basename(path)}")
-            else:
-                print("Stem separation failed.")
+        print(f"\nSeparating stems ({args.stem_model})...")
+        result = separate(final_path, model=args.stem_model, audio=audio)
+        if result:
+            print("Stems saved:")
+            for name, path in result.items():
+                print(f"  {name}: {os.path.basename(path)}")
+        else:
+            print("Stem separation failed.")
 
     # Post-download: BPM/key analysis
-    if args.analyze and mode == "mp3" and info:
+    if args.analyze and final_path:
         from analysis import analyze, format_result
-        title = info.get("title", "Unknown")
-        mp3_path = os.path.join(args.output, f"{title}.mp3")
-        if os.path.isfile(mp3_path):
-            print(f"\nAnalyzing BPM and key...")
-            result = analyze(mp3_path)
-            if result:
-                print(f"  {format_result(result)}")
-            else:
-                print("Analysis failed.")
+        print(f"\nAnalyzing BPM and key...")
+        result = analyze(final_path, audio=audio)
+        if result:
+            print(f"  {format_result(result)}")
+        else:
+            print("Analysis failed.")
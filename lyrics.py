@@ -6,10 +6,29 @@
 import re
 import os
 
+# Read/write buffer for subtitle files (default is 8 KB)
+IO_BUFFER = 64 * 1024
+
+# SRT patterns, compiled once
+_SRT_TIME = re.compile(r'(\d+):(\d+):(\d+)[,.](\d+)')
+_SRT_RANGE = re.compile(r'(\d+:\d+:\d+[,.]\d+)\s*-->\s*(\d+:\d+:\d+[,.]\d+)')
+_HTML_TAG = re.compile(r'<[^>]+>')
+
 
 def srt_time_to_lrc(srt_time):
     """Convert SRT timestamp (HH:MM:SS,mmm) to LRC timestamp [MM:SS.xx]."""
-    match = re.match(r'(\d+):(\d+):(\d+)[,.](\d+)', srt_time)
+    # Fast path: the standard fixed-width form, sliced instead of regex-parsed.
+    # Every slice must be plain ASCII digits — int() alone would also accept
+    # signs, spaces and underscores that the regex rejects.
+    if (len(srt_time) == 12 and srt_time[2] == ":" and srt_time[5] == ":"
+            and srt_time[8] in ",." and srt_time.isascii()):
+        hh, mm, ss, mmm = srt_time[0:2], srt_time[3:5], srt_time[6:8], srt_time[9:12]
+        if hh.isdigit() and mm.isdigit() and ss.isdigit() and mmm.isdigit():
+            total_min = int(hh) * 60 + int(mm)
+            centisec = int(mmm) // 10
+            return f"[{total_min:02d}:{ss}.{centisec:02d}]"
+
+    match = _SRT_TIME.fullmatch(srt_time)
     if not match:
         return None
     h, m, s, ms = int(match[1]), int(match[2]), int(match[3]), int(match[4])
@@ -32,42 +51,60 @@ def srt_to_lrc(srt_path, lrc_path=None):
         lrc_path = os.path.splitext(srt_path)[0] + ".lrc"
 
     try:
-        with open(srt_path, "r", encoding="utf-8") as f:
-            content = f.read()
+        src = open(srt_path, "r", encoding="utf-8", buffering=IO_BUFFER)
     except FileNotFoundError:
         return None
 
-    # Parse SRT blocks: number, timestamp line, text lines
-    blocks = re.split(r'\n\s*\n', content.strip())
-    lines = []
-
-    for block in blocks:
-        block_lines = block.strip().split('\n')
-        if len(block_lines) < 3:
-            continue
-
-        # Second line has timestamps: 00:01:23,456 --> 00:01:25,789
-        time_match = re.match(
-            r'(\d+:\d+:\d+[,.]\d+)\s*-->\s*(\d+:\d+:\d+[,.]\d+)',
-            block_lines[1]
-        )
-        if not time_match:
-            continue
-
-        lrc_time = srt_time_to_lrc(time_match.group(1))
-        if lrc_time is None:
-            continue
-
-        # Join remaining text lines (strip HTML tags)
-        text = " ".join(block_lines[2:])
-        text = re.sub(r'<[^>]+>', '', text).strip()
-        if text:
-            lines.append(f"{lrc_time}{text}")
-
-    if not lines:
-        return None
-
-    with open(lrc_path, "w", encoding="utf-8") as f:
-        f.write("\n".join(lines) + "\n")
-
-    return lrc_path
+    # Stream the SRT one cue at a time: number, timestamp line, text lines,
+    # then a blank line. Only the current cue is held in memory.
+    out = None
+    cue = []
+    try:
+        with src:
+            for raw in src:
+                line = raw.rstrip("\n")
+                if line.strip():
+                    cue.append(line)
+                    continue
+                if cue:
+                    out = _write_cue(cue, out, lrc_path)
+                    cue = []
+            if cue:
+                out = _write_cue(cue, out, lrc_path)
+    finally:
+        if out is not None:
+            out.close()
+
+    return lrc_path if out is not None else None
+
+
+def _write_cue(cue, out, lrc_path):
+    """Write one SRT cue (list of lines) as an LRC line.
+    The output file is only created once the first cue converts.
+    Returns the (possibly newly opened) output file.
+    """
+    if len(cue) < 3:
+        return out
+
+    # Second line has timestamps: 00:01:23,456 --> 00:01:25,789
+    time_match = _SRT_RANGE.match(cue[1])
+    if not time_match:
+        return out
+
+    lrc_time = srt_time_to_lrc(time_match.group(1))
+    if lrc_time is None:
+        return out
+
+    # Join remaining text lines (strip HTML tags; most cues have none)
+    text = " ".join(cue[2:])
+    if "<" in text:
+        text = _HTML_TAG.sub('', text)
+    if text and (text[0].isspace() or text[-1].isspace()):
+        text = text.strip()
+    if not text:
+        return out
+
+    if out is None:
+        out = open(lrc_path, "w", encoding="utf-8", buffering=IO_BUFFER)
+    out.write(f"{lrc_time}{text}\n")
+    return out
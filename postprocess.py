@@ -0,0 +1,273 @@
+# postprocess.py — custom yt-dlp postprocessors for Bongoo
+# by itu-dallasli
+#
+# yt-dlp's stock MP3 chain runs FFmpeg once to encode (FFmpegExtractAudio),
+# again to mux the cover art (EmbedThumbnail) and again for the tags
+# (FFmpegMetadata). Mp3EncodePP does all three in a single FFmpeg run, with
+# optional loudness normalization.
+#
+# Also holds the yt-dlp helpers shared by app.py and download.py (YoutubeDL
+# setup, 429 retries, browser cookie probing, result paths).
+
+import os
+import json
+import math
+import sqlite3
+import subprocess
+import threading
+import time
+
+import yt_dlp
+from yt_dlp.postprocessor import FFmpegMetadataPP, FFmpegPostProcessor, get_postprocessor
+from yt_dlp.cookies import CookieLoadError, extract_cookies_from_browser
+from yt_dlp.networking.exceptions import HTTPError
+from yt_dlp.utils import (
+    DownloadError, ExtractorError, PlaylistEntries, Popen, YoutubeDLError,
+    prepend_extension, replace_extension,
+)
+
+# EBU R128 loudnorm target: -14 LUFS integrated, -1 dBTP true peak
+LOUDNORM_TARGET = "I=-14:TP=-1:LRA=11"
+
+# Whole-request retries after an HTTP 429 (yt-dlp's own retries are off,
+# since hammering a rate-limited endpoint only extends the block)
+RATE_LIMIT_RETRIES = 3
+
+
+class Mp3EncodePP(FFmpegPostProcessor):
+    """Encode the downloaded audio to CBR MP3, attach the cover art (if a
+    thumbnail was written) and write the tags in one FFmpeg invocation.
+    Replaces FFmpegExtractAudio + EmbedThumbnail + FFmpegMetadata on the
+    MP3 path; the tags and chapters are the ones FFmpegMetadata would write.
+
+    With normalize=True the source is first measured with loudnorm (a
+    decode-only pass), then the encode applies loudnorm in linear mode with
+    those measurements — a constant gain instead of the dynamic filter.
+    """
+
+    def __init__(self, downloader=None, bitrate="320k", normalize=False, metadata=True):
+        super().__init__(downloader)
+        self._bitrate = bitrate
+        self._normalize = normalize
+        self._metadata = metadata
+
+    @staticmethod
+    def _thumbnail_path(info):
+        # Same lookup as EmbedThumbnail: the last thumbnail written to disk
+        for thumb in reversed(info.get("thumbnails") or []):
+            path = thumb.get("filepath")
+            if path and os.path.isfile(path):
+                return path
+        return None
+
+    def _loudnorm_filter(self, src):
+        """Measure src and return the linear loudnorm filter for it.
+        Falls back to dynamic (single-pass) loudnorm if the measurement is
+        unusable, e.g. for a silent track.
+        """
+        self.to_screen("Measuring loudness")
+        cmd = [
+            self.executable, "-hide_banner", "-nostdin",
+            "-i", self._ffmpeg_filename_argument(src), "-map", "0:a:0",
+            "-af", f"loudnorm={LOUDNORM_TARGET}:print_format=json",
+            "-f", "null", "-",
+        ]
+        _, stderr, returncode = Popen.run(
+            cmd, text=True, stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        try:
+            if returncode != 0:
+                raise ValueError
+            # loudnorm prints its JSON block last
+            stats = json.loads(stderr[stderr.rindex("{"):stderr.rindex("}") + 1])
+            measured = [float(stats[k]) for k in
+                        ("input_i", "input_tp", "input_lra", "input_thresh", "target_offset")]
+            if not all(map(math.isfinite, measured)):
+                raise ValueError
+        except (ValueError, KeyError, TypeError):
+            self.report_warning("Loudness measurement failed; using dynamic loudnorm")
+            return f"loudnorm={LOUDNORM_TARGET}"
+        i, tp, lra, thresh, offset = measured
+        return (f"loudnorm={LOUDNORM_TARGET}:measured_I={i}:measured_TP={tp}"
+                f":measured_LRA={lra}:measured_thresh={thresh}:offset={offset}"
+                f":linear=true")
+
+    def run(self, info):
+        src = info["filepath"]
+        out = os.path.splitext(src)[0] + ".mp3"
+        tmp = prepend_extension(out, "temp")
+        thumb = self._thumbnail_path(info)
+
+        inputs = [src]
+        args = ["-map", "0:a:0", "-c:a", "libmp3lame", "-b:a", self._bitrate]
+        if self._normalize:
+            args += ["-af", self._loudnorm_filter(src)]
+        if thumb:
+            inputs.append(thumb)
+            args += [
+                "-map", "1:0", "-c:v", "mjpeg",
+                "-disposition:v", "attached_pic",
+                "-metadata:s:v", "title=Album cover",
+                "-metadata:s:v", "comment=Cover (front)",
+            ]
+        args += ["-id3v2_version", "3", "-write_id3v1", "1"]
+
+        meta_file = None
+        if self._metadata:
+            # Borrow FFmpegMetadata's tag/chapter options instead of running it
+            meta_pp = FFmpegMetadataPP(self._downloader)
+            if info.get("chapters"):
+                self._fixup_chapters(info)
+                meta_file = replace_extension(out, "meta")
+                # Writes the FFMETADATA chapter file; its own -map_metadata
+                # assumes the file is input 1, so point at our index instead
+                list(meta_pp._get_chapter_opts(info["chapters"], meta_file))
+                args += ["-map_metadata", str(len(inputs))]
+                inputs.append(meta_file)
+            for opt in meta_pp._get_metadata_opts(info):
+                args += opt
+
+        self.to_screen(f'Encoding MP3{" with cover art" if thumb else ""}: "{out}"')
+        try:
+            self.run_ffmpeg_multiple_files(inputs, tmp, args)
+        finally:
+            if meta_file:
+                try:
+                    os.remove(meta_file)
+                except OSError:
+                    pass
+        os.replace(tmp, out)
+
+        info["filepath"] = out
+        info["ext"] = "mp3"
+        to_delete = [] if src == out else [src]
+        if thumb:
+            to_delete.append(thumb)
+        return to_delete, info
+
+
+def final_filepath(info):
+    """Path of the finished file as written by yt-dlp (after postprocessing)."""
+    downloads = info.get("requested_downloads") or []
+    return downloads[-1].get("filepath") if downloads else None
+
+
+def subtitle_files(info, ext=".srt"):
+    """Paths of the subtitle files yt-dlp wrote for info (exact names, after
+    yt-dlp's filename sanitizing), limited to ext and to files that exist.
+    """
+    subs = (info.get("requested_subtitles") or {}).values()
+    paths = [sub.get("filepath") for sub in subs]
+    return [p for p in paths if p and p.endswith(ext) and os.path.isfile(p)]
+
+
+# Bongoo's own keys, usable in opts["postprocessors"] next to yt-dlp's
+CUSTOM_POSTPROCESSORS = {
+    "BongooMp3Encode": Mp3EncodePP,
+}
+
+
+def build_ydl(opts):
+    """Create a YoutubeDL from opts, resolving CUSTOM_POSTPROCESSORS keys.
+    Postprocessors are added in list order, so custom and stock ones can
+    be interleaved (yt-dlp itself only knows its built-in keys).
+    """
+    pp_defs = opts.get("postprocessors") or []
+    ydl = yt_dlp.YoutubeDL(dict(opts, postprocessors=[]))
+    for pp_def in pp_defs:
+        pp_def = dict(pp_def)
+        key = pp_def.pop("key")
+        when = pp_def.pop("when", "post_process")
+        pp_class = CUSTOM_POSTPROCESSORS.get(key) or get_postprocessor(key)
+        ydl.add_post_processor(pp_class(ydl, **pp_def), when=when)
+    return ydl
+
+
+# Seconds to wait for one browser's cookie jar (a keyring unlock prompt can
+# block indefinitely)
+COOKIE_PROBE_TIMEOUT = 5.0
+
+
+def read_browser_cookies(browser):
+    """Return browser's cookie jar, or None if it is unavailable or the
+    read takes longer than COOKIE_PROBE_TIMEOUT. Runs on a daemon thread,
+    so a hung keyring prompt is abandoned rather than waited on.
+    """
+    result = []
+
+    def probe():
+        try:
+            result.append(extract_cookies_from_browser(browser))
+        except (OSError, ValueError, sqlite3.Error, YoutubeDLError):
+            pass  # browser not installed, no profile, DB locked, decrypt failed
+
+    worker = threading.Thread(target=probe, daemon=True)
+    worker.start()
+    worker.join(COOKIE_PROBE_TIMEOUT)
+    return result[0] if result else None
+
+
+def _rate_limit_wait(attempt):
+    """Seconds to wait before retry number attempt (0-based) after a 429."""
+    return min(300, 30 * 2 ** attempt)
+
+
+def _is_rate_limited(error):
+    """True if the DownloadError was caused by an HTTP 429 response."""
+    exc = error.exc_info[1] if error.exc_info else None
+    if isinstance(exc, ExtractorError):  # extractors wrap network errors
+        exc = exc.cause
+    return isinstance(exc, HTTPError) and exc.status == 429
+
+
+def is_cookie_failure(error):
+    """True if error means the cookies couldn't be loaded or YouTube wants a
+    (fresh) login — the cases where re-probing the browser can help.
+    """
+    exc = error
+    if isinstance(exc, DownloadError) and exc.exc_info:
+        exc = exc.exc_info[1]
+    if isinstance(exc, CookieLoadError):
+        return True
+    # Login-required and bot-check errors carry yt-dlp's cookies hint
+    return isinstance(exc, ExtractorError) and "--cookies" in str(exc)
+
+
+def _retry_on_429(func, on_retry):
+    """Call func(), retrying with long backoff while it fails with HTTP 429."""
+    for attempt in range(RATE_LIMIT_RETRIES + 1):
+        try:
+            return func()
+        except DownloadError as e:
+            if not _is_rate_limited(e) or attempt == RATE_LIMIT_RETRIES:
+                raise
+            wait = _rate_limit_wait(attempt)
+            if on_retry:
+                on_retry(wait)
+            time.sleep(wait)
+
+
+def extract_with_retry(ydl, url, on_retry=None, download=True):
+    """ydl.extract_info(url, download=download), retried with long backoff on
+    HTTP 429. on_retry(wait_seconds) is called before each wait, e.g. to log it.
+
+    When downloading a playlist, each entry is retried on its own, so a rate
+    limit halfway through doesn't restart the playlist from the first entry.
+    The returned playlist info has the processed entries as a list.
+    """
+    if not download:
+        return _retry_on_429(lambda: ydl.extract_info(url, download=False), on_retry)
+
+    # Resolve the URL once without processing it, then process the result
+    # (a video) or each of its entries (a playlist) under its own retry
+    ie_result = _retry_on_429(
+        lambda: ydl.extract_info(url, download=False, process=False), on_retry)
+    if ie_result.get("_type") not in ("playlist", "multi_video"):
+        return _retry_on_429(lambda: ydl.process_ie_result(ie_result, download=True), on_retry)
+
+    done = []
+    for _, entry in PlaylistEntries(ydl, ie_result).get_requested_items():
+        if entry:
+            done.append(_retry_on_429(
+                lambda: ydl.process_ie_result(entry, download=True), on_retry))
+    return dict(ie_result, entries=done)
@@ -6,10 +6,42 @@
 
 import os
 import shutil
+import subprocess
+import threading
 import traceback
+import collections
+from concurrent.futures import ThreadPoolExecutor
+
+# Inputs libsndfile can't (reliably) read — decoded through FFmpeg instead
+_FFMPEG_EXTS = {".mp3", ".m4a", ".aac", ".opus", ".webm", ".ogg"}
+
+# Rate the Open-Unmix models were trained at
+UMX_SAMPLE_RATE = 44100
+
+# Open-Unmix runs on windows of this many seconds, cross-faded over the
+# overlap, so memory stays bounded however long the track is
+UMX_CHUNK_SECONDS = 30
+UMX_OVERLAP_SECONDS = 1
 
 _torchaudio_patched = False
 
+# demucs.separate, imported on first Demucs run
+_demucs = None
+
+
+def _load_demucs():
+    """Import demucs.separate once; returns the module or None."""
+    global _demucs
+    if _demucs is None:
+        try:
+            import demucs.separate
+        except ImportError:
+            print("Demucs not installed. Install: pip install demucs")
+            return None
+        _demucs = demucs.separate
+    return _demucs
+
+
 def _patch_torchaudio_save():
     """Replace torchaudio.save with a soundfile-based fallback.
     Fixes 'torchcodec is required' errors in newer torchaudio versions.
@@ -17,6 +49,7 @@ def _patch_torchaudio_save():
     global _torchaudio_patched
     if _torchaudio_patched:
         return
+    _torchaudio_patched = True  # one attempt per session, even if it fails
 
     try:
         import torchaudio
@@ -32,20 +65,22 @@ def _patch_torchaudio_save():
             sf.write(str(uri), data, sample_rate)
 
         torchaudio.save = _sf_save
-        _torchaudio_patched = True
         print("Patched torchaudio.save → soundfile backend")
     except ImportError:
         print("Warning: could not patch torchaudio (soundfile missing)")
 
 
 
-def separate(input_path, output_dir=None, model="openunmix"):
+def separate(input_path, output_dir=None, model="openunmix", audio=None):
     """Separate an audio file into stems.
 
     Args:
         input_path:  Path to the input audio file (MP3/WAV)
         output_dir:  Output directory (default: same dir as input + _stems)
         model:       "openunmix" (light, ~150MB) or "demucs" (heavy, ~1.5GB)
+        audio:       Optional (samples, sample_rate) from load_audio(input_path),
+                     to skip decoding it again (Open-Unmix only; Demucs
+                     reads the file itself)
 
     Returns:
         dict with stem paths {"vocals": path, "drums": path, ...}
@@ -65,15 +100,13 @@ def separate(input_path, output_dir=None, model="openunmix"):
     if model == "demucs":
         return _separate_demucs(input_path, output_dir, basename)
     else:
-        return _separate_openunmix(input_path, output_dir, basename)
+        return _separate_openunmix(input_path, output_dir, basename, audio)
 
 
 def _separate_demucs(input_path, output_dir, basename):
     """Separate using Meta's Demucs model (best quality, heavy)."""
-    try:
-        import demucs.separate
-    except ImportError:
-        print("Demucs not installed. Install: pip install demucs")
+    demucs_separate = _load_demucs()
+    if demucs_separate is None:
         return None
 
     try:
@@ -81,7 +114,7 @@ def _separate_demucs(input_path, output_dir, basename):
         _patch_torchaudio_save()
 
         # Demucs outputs to: output_dir/htdemucs/basename/{vocals,drums,bass,other}.wav
-        demucs.separate.main([
+        demucs_separate.main([
             "--two-stems", "vocals",
             "-n", "htdemucs",
             "-o", output_dir,
@@ -96,7 +129,138 @@ def _separate_demucs(input_path, output_dir, basename):
         return None
 
 
-def _separate_openunmix(input_path, output_dir, basename):
+def _decode_ffmpeg(input_path, sample_rate=UMX_SAMPLE_RATE):
+    """Decode any FFmpeg-readable file to float32 stereo, shape (samples, 2).
+    PCM is read from FFmpeg's stdout — no temporary WAV on disk.
+    """
+    import numpy as np
+    proc = subprocess.Popen(
+        ["ffmpeg", "-nostdin", "-v", "error", "-i", input_path,
+         "-f", "f32le", "-ac", "2", "-ar", str(sample_rate), "pipe:1"],
+        stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+    )
+    # Drain stderr alongside stdout (a corrupt file can log per frame and
+    # would otherwise fill the pipe and stall FFmpeg); keep only the tail
+    err_tail = collections.deque(maxlen=10)
+    err_reader = threading.Thread(target=err_tail.extend, args=(proc.stderr,), daemon=True)
+    err_reader.start()
+
+    buf = bytearray()  # writable, so torch.from_numpy can share it
+    while True:
+        chunk = proc.stdout.read(1 << 20)
+        if not chunk:
+            break
+        buf += chunk
+    proc.wait()
+    err_reader.join()
+    if proc.returncode != 0:
+        msg = b"".join(err_tail).decode(errors="replace").strip()
+        raise RuntimeError(f"FFmpeg decode failed: {msg}")
+    return np.frombuffer(buf, dtype=np.float32).reshape(-1, 2), sample_rate
+
+
+# Loaded Open-Unmix separators, keyed by (model name, device)
+_MODEL_CACHE = {}
+
+
+def _get_separator(name, device):
+    """Load an Open-Unmix model via torch.hub once per session."""
+    key = (name, device)
+    separator = _MODEL_CACHE.get(key)
+    if separator is None:
+        import torch
+        print(f"Loading Open-Unmix model ({name})...")
+        separator = torch.hub.load(
+            "sigsep/open-unmix-pytorch", name,
+            device=device,
+            trust_repo=True,
+            skip_validation=True,  # no GitHub API round-trip on reruns
+        )
+        separator.eval()
+        _MODEL_CACHE[key] = separator
+    return separator
+
+
+def _separate_chunked(separator, audio, device, sample_rate):
+    """Run separator over audio (channels, samples) window by window.
+
+    Each window's estimates go back to the CPU straight away, so only one
+    window is ever on the device. Neighbouring windows overlap and are
+    blended with complementary raised-cosine ramps.
+    Returns float32 array (sources, samples, channels).
+    """
+    import numpy as np
+    import torch
+
+    channels, total = audio.shape
+    window = int(UMX_CHUNK_SECONDS * sample_rate)
+    overlap = int(UMX_OVERLAP_SECONDS * sample_rate)
+    fade_in = (0.5 - 0.5 * np.cos(np.pi * np.arange(overlap) / overlap)).astype(np.float32)
+    fade_in = fade_in[:, None]  # broadcast over channels
+
+    # Half precision on the GPU (tensor cores, half the activation traffic);
+    # CPUs gain little from it, so they stay in float32
+    half = device == "cuda"
+
+    out = None
+    start = 0
+    while True:
+        end = min(start + window, total)
+        with torch.no_grad(), torch.autocast(device_type=device, dtype=torch.float16, enabled=half):
+            est = separator(audio[None, :, start:end].to(device))
+        # (1, sources, channels, n) → (sources, n, channels)
+        est = est[0].float().cpu().numpy().transpose(0, 2, 1)
+        if out is None:
+            out = np.zeros((est.shape[0], total, channels), dtype=np.float32)
+
+        if start > 0:
+            est[:, :overlap] *= fade_in
+        if end < total:
+            est[:, -overlap:] *= 1.0 - fade_in
+        out[:, start:end] += est
+
+        if end == total:
+            return out
+        start = end - overlap
+
+
+def load_audio(input_path):
+    """Decode an audio file to float32 samples, (samples,) or (samples, channels).
+    WAV/FLAC go through soundfile; compressed formats are decoded by
+    FFmpeg straight into memory.
+    Returns (samples, sample_rate).
+    """
+    if os.path.splitext(input_path)[1].lower() in _FFMPEG_EXTS:
+        return _decode_ffmpeg(input_path)
+    import soundfile as sf
+    try:
+        return sf.read(input_path, dtype="float32")
+    except RuntimeError:
+        return _decode_ffmpeg(input_path)
+
+
+def _read_stereo_planar(input_path):
+    """Stream a soundfile-readable file into a (2, samples) float32 tensor.
+    Blocks are copied straight into the preallocated tensor, so the whole
+    file never exists twice in memory. Mono is duplicated into both rows;
+    extra channels beyond the first two are dropped.
+    Returns (audio, sample_rate).
+    """
+    import soundfile as sf
+    import torch
+    with sf.SoundFile(input_path) as snd:
+        audio = torch.empty((2, snd.frames), dtype=torch.float32)
+        pos = 0
+        for block in snd.blocks(blocksize=1 << 16, dtype="float32", always_2d=True):
+            n = len(block)
+            if pos + n > audio.shape[1]:  # header under-reported the length
+                audio = torch.cat([audio[:, :pos], torch.empty((2, n), dtype=torch.float32)], dim=1)
+            audio[:, pos:pos + n] = torch.from_numpy(block[:, :2].T)  # broadcasts mono
+            pos += n
+        return audio[:, :pos], snd.samplerate
+
+
+def _separate_openunmix(input_path, output_dir, basename, audio=None):
     """Separate using Open-Unmix model (lighter, faster).
     Uses torch.hub to load the pre-trained umxhq model.
     Uses soundfile for audio I/O (avoids torchcodec dependency).
@@ -114,55 +278,52 @@ def _separate_openunmix(input_path, output_dir, basename):
         return None
 
     try:
-        print(f"Loading audio: {input_path}")
-        # Use soundfile to read audio (works with WAV, FLAC, OGG; for MP3 needs ffmpeg conversion)
-        try:
-            data, sample_rate = sf.read(input_path, dtype="float32")
-        except RuntimeError:
-            # soundfile can't read MP3 directly — convert via ffmpeg first
-            import subprocess, tempfile
-            tmp_wav = os.path.join(output_dir, "_temp_input.wav")
-            subprocess.run(
-                ["ffmpeg", "-y", "-i", input_path, "-ar", "44100", tmp_wav],
-                capture_output=True
-            )
-            data, sample_rate = sf.read(tmp_wav, dtype="float32")
-            os.remove(tmp_wav)
-
-        # data shape: (samples,) for mono or (samples, channels) for stereo
-        waveform = torch.from_numpy(data).float()
-        if waveform.dim() == 1:
-            waveform = waveform.unsqueeze(1).repeat(1, 2)  # mono → stereo
-        # shape: (samples, channels) → (channels, samples)
-        waveform = waveform.T
-
-        # Add batch dimension: (channels, samples) → (batch, channels, samples)
-        audio = waveform.unsqueeze(0)
+        data = None
+        if audio is not None:
+            data, sample_rate = audio
+        elif os.path.splitext(input_path)[1].lower() in _FFMPEG_EXTS:
+            print(f"Loading audio: {input_path}")
+            data, sample_rate = _decode_ffmpeg(input_path)
+        else:
+            print(f"Loading audio: {input_path}")
+            try:
+                audio, sample_rate = _read_stereo_planar(input_path)
+            except RuntimeError:
+                data, sample_rate = _decode_ffmpeg(input_path)
+
+        if data is not None:
+            # data shape: (samples,) for mono or (samples, channels) for stereo
+            waveform = torch.from_numpy(data).float()
+            if waveform.dim() == 1:
+                # mono → stereo, built directly as a contiguous (2, samples)
+                audio = torch.stack([waveform, waveform])
+            else:
+                # (samples, channels) → (channels, samples); a view — each
+                # window is copied to the device on its own
+                audio = waveform.T
 
         device = "cuda" if torch.cuda.is_available() else "cpu"
 
-        print("Loading Open-Unmix model (umxhq)...")
-        separator = torch.hub.load(
-            "sigsep/open-unmix-pytorch", "umxhq",
-            device=device
-        )
-        separator.eval()
+        separator = _get_separator("umxhq", device)
 
         print("Separating stems...")
-        with torch.no_grad():
-            estimates = separator(audio.to(device))
-            # estimates shape: (batch, sources, channels, samples)
+        estimates = _separate_chunked(separator, audio, device, sample_rate)
+        # estimates shape: (sources, samples, channels)
 
         source_names = ["vocals", "drums", "bass", "other"]
         stems = {}
+        for i, stem_name in enumerate(source_names[:estimates.shape[0]]):
+            stems[stem_name] = os.path.join(output_dir, f"{basename}_{stem_name}.wav")
+
+        # estimates[i] is already a contiguous (samples, channels) float32
+        # block, and libsndfile releases the GIL — write all stems at once
+        def write_stem(i, stem_name):
+            sf.write(stems[stem_name], estimates[i], sample_rate)
+            print(f"  Saved: {stem_name} → {os.path.basename(stems[stem_name])}")
 
-        for i, stem_name in enumerate(source_names):
-            if i < estimates.shape[1]:
-                stem_audio = estimates[0, i].cpu().numpy().T  # (samples, channels)
-                stem_path = os.path.join(output_dir, f"{basename}_{stem_name}.wav")
-                sf.write(stem_path, stem_audio, sample_rate)
-                stems[stem_name] = stem_path
-                print(f"  Saved: {stem_name} → {os.path.basename(stem_path)}")
+        with ThreadPoolExecutor(max_workers=len(stems) or 1) as pool:
+            for fut in [pool.submit(write_stem, i, name) for i, name in enumerate(stems)]:
+                fut.result()
 
         return stems if stems else None
 
@@ -177,14 +338,20 @@ def _collect_stems(stem_dir, output_dir, basename):
     stems = {}
     # --two-stems produces: vocals.wav + no_vocals.wav
     # full mode produces: vocals.wav, drums.wav, bass.wav, other.wav
-    for stem_name in ["vocals", "no_vocals", "drums", "bass", "other"]:
-        src = os.path.join(stem_dir, f"{stem_name}.wav")
-        # Rename no_vocals to a friendlier name
-        out_name = "backing_track" if stem_name == "no_vocals" else stem_name
-        dst = os.path.join(output_dir, f"{basename}_{out_name}.wav")
-        if os.path.isfile(src):
-            shutil.move(src, dst)
-            stems[out_name] = dst
+    try:
+        with os.scandir(stem_dir) as it:
+            for entry in it:
+                stem_name, ext = os.path.splitext(entry.name)
+                if ext != ".wav":
+                    continue
+                # Rename no_vocals to a friendlier name
+                out_name = "backing_track" if stem_name == "no_vocals" else stem_name
+                dst = os.path.join(output_dir, f"{basename}_{out_name}.wav")
+                # stem_dir is inside output_dir, so this is a plain rename
+                os.replace(entry.path, dst)
+                stems[out_name] = dst
+    except FileNotFoundError:
+        pass
 
     # Clean up demucs directory structure
     htdemucs_dir = os.path.join(output_dir, "htdemucs")